@@ -28,81 +28,85 @@
 
 import fnmatch
 import subprocess
-import tempfile
-import re
 import os
-import shutil
+import shlex
+from xml.etree import ElementTree
 
+SNAPSHOT_SUFFIX = '-SNAPSHOT'
+
+# Runs the given command without a shell. The command
+# is either an argv list or a string that is split
+# like a shell would split it.
 def run(command):
-  if os.system('%s' % (command)):
+  argv = shlex.split(command) if isinstance(command, str) else command
+  if subprocess.run(argv).returncode:
     raise RuntimeError('    FAILED: %s' % (command))
 
 def ensure_checkout_is_clean():
+  s = subprocess.check_output(['git', 'status', '--porcelain=v2', '--branch']).decode('utf-8', errors='replace')
+  ahead = behind = 0
+  modified = untracked = False
+  for line in s.splitlines():
+    if line.startswith('# branch.ab '):
+      ahead, behind = (abs(int(count)) for count in line.split()[2:4])
+    elif line.startswith(('1 ', '2 ', 'u ')):
+      modified = True
+    elif line.startswith('? '):
+      untracked = True
+
   # Make sure no local mods:
-  s = subprocess.check_output('git diff --shortstat', shell=True)
-  if len(s) > 0:
-    raise RuntimeError('git diff --shortstat is non-empty: got:\n%s' % s)
+  if modified:
+    raise RuntimeError('git status shows local modifications: got:\n%s' % s)
 
   # Make sure no untracked files:
-  s = subprocess.check_output('git status', shell=True).decode('utf-8', errors='replace')
-  if 'Untracked files:' in s:
+  if untracked:
     raise RuntimeError('git status shows untracked files: got:\n%s' % s)
 
   # Make sure we have all changes from origin:
-  if 'is behind' in s:
+  if behind:
     raise RuntimeError('git status shows not all changes pulled from origin; try running "git pull origin" in this branch: got:\n%s' % (s))
 
   # Make sure we no local unpushed changes (this is supposed to be a clean area):
-  if 'is ahead' in s:
+  if ahead:
     raise RuntimeError('git status shows local commits; try running "git fetch origin", "git checkout ", "git reset --hard origin/" in this branch: got:\n%s' % (s))
 
 # Reads the given file and applies the
-# callback to it. If the callback changed
-# a line the given file is replaced with
-# the modified input.
-def process_file(file_path, line_callback):
-  fh, abs_path = tempfile.mkstemp()
-  modified = False
-  with open(abs_path,'w', encoding='utf-8') as new_file:
-    with open(file_path, encoding='utf-8') as old_file:
-      for line in old_file:
-        new_line = line_callback(line)
-        modified = modified or (new_line != line)
-        new_file.write(new_line)
-  os.close(fh)
-  if modified:
-    #Remove original file
-    os.remove(file_path)
-    #Move new file
-    shutil.move(abs_path, file_path)
-    return True
-  else:
-    # nothing to do - just remove the tmp file
-    os.remove(abs_path)
+# callback to its content. If the callback
+# changed the content the given file is
+# overwritten with the modified text.
+def process_file(file_path, text_callback):
+  with open(file_path, encoding='utf-8') as old_file:
+    old_text = old_file.read()
+  new_text = text_callback(old_text)
+  if new_text == old_text:
     return False
+  with open(file_path, 'w', encoding='utf-8') as new_file:
+    new_file.write(new_text)
+  return True
 
 # Checks the pom.xml for the release version.
 # This method fails if the pom file has no SNAPSHOT version set ie.
 # if the version is already on a release version we fail.
 # Returns the next version string ie. 0.90.7
 def find_release_version():
-  with open('pom.xml', encoding='utf-8') as file:
-    for line in file:
-      match = re.search(r'<version>(.+)-SNAPSHOT</version>', line)
-      if match:
-        return match.group(1)
-    raise RuntimeError('Could not find release version in branch')
+  for _, elem in ElementTree.iterparse('pom.xml', events=('end',)):
+    if elem.tag == 'version' or elem.tag.endswith('}version'):
+      version = (elem.text or '').strip()
+      if version.endswith(SNAPSHOT_SUFFIX):
+        return version[:-len(SNAPSHOT_SUFFIX)]
+    elem.clear()
+  raise RuntimeError('Could not find release version in branch')
 
 # Stages the given files for the next git commit
 def add_pending_files(*files):
   for file in files:
     if file:
       # print("Adding file: %s" % (file))
-      run('git add %s' % (file))
+      run(['git', 'add', file])
 
 # Updates documentation feature flags
 def commit_feature_flags(release):
-    run('git commit -m "Update Documentation Feature Flags [%s]"' % release)
+    run(['git', 'commit', '-m', 'Update Documentation Feature Flags [%s]' % release])
 
 # Walks the given directory path (defaults to 'docs')
 # and replaces all 'coming[$version]' tags with
@@ -111,8 +115,8 @@ def update_reference_docs(release_version, path='docs'):
   pattern = 'coming[%s' % (release_version)
   replacement = 'added[%s' % (release_version)
   pending_files = []
-  def callback(line):
-    return line.replace(pattern, replacement)
+  def callback(text):
+    return text.replace(pattern, replacement)
   for root, _, file_names in os.walk(path):
     for file_name in fnmatch.filter(file_names, '*.asciidoc'):
       full_path = os.path.join(root, file_name)